@@ -1,10 +1,10 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import gspread
 from google.oauth2.service_account import Credentials
-from collections import defaultdict
-import itertools
-import random
+
+from matchmaking import clean_name, clean_names, generate_matchups, new_seed
 
 # ======================
 # Google Sheets Setup
@@ -14,161 +14,173 @@ scope = [
     "https://www.googleapis.com/auth/drive",
 ]
 
-# Load credentials from Streamlit Secrets
-creds_dict = st.secrets["gcp_service_account"]
-creds = Credentials.from_service_account_info(dict(creds_dict), scopes=scope)
-client = gspread.authorize(creds)
-
 # Replace with your Google Sheet name
 SHEET_NAME = "badminton_scheduler"
-sheet = client.open(SHEET_NAME).sheet1
+
+
+# Streamlit reruns this script on every interaction; the handles below are
+# created once per server process instead of on every rerun.
+@st.cache_resource
+def get_client():
+    """Authorize gspread with the service account from Streamlit Secrets."""
+    creds_dict = st.secrets["gcp_service_account"]
+    creds = Credentials.from_service_account_info(dict(creds_dict), scopes=scope)
+    return gspread.authorize(creds)
+
+
+@st.cache_resource
+def get_spreadsheet():
+    """Open the scheduler spreadsheet."""
+    return get_client().open(SHEET_NAME)
+
+
+@st.cache_resource
+def get_worksheet(title=None):
+    """Worksheet by title, or the first sheet (player list) if no title is given."""
+    sh = get_spreadsheet()
+    return sh.sheet1 if title is None else sh.worksheet(title)
+
+
+@st.cache_resource
+def get_matchup_sheet():
+    """The 'Matchmaking' worksheet, created on first use."""
+    try:
+        return get_worksheet("Matchmaking")
+    except gspread.WorksheetNotFound:
+        return get_spreadsheet().add_worksheet(title="Matchmaking", rows="100", cols="20")
+
+
+sheet = get_worksheet()
 
 
 # ======================
 # Functions
 # ======================
-def clean_name(name: str) -> str:
-    """Remove non-printable characters and extra spaces from names."""
-    return "".join(ch for ch in str(name).strip() if ch.isprintable())
-
-
+@st.cache_data(ttl=60, show_spinner=False)
 def get_players():
-    """Fetch player list from Google Sheet and clean names."""
-    data = sheet.get_all_records()
-    df = pd.DataFrame(data)
+    """Fetch player list from Google Sheet and clean names (cached for 60s)."""
+    values = sheet.get_all_values()
+    if not values:
+        return pd.DataFrame()
+    df = pd.DataFrame(values[1:], columns=values[0])
 
     if "Name" in df.columns:
-        df["Name"] = df["Name"].apply(clean_name)
+        df["Name"] = clean_names(df["Name"])
+    if "EarlyLeave" in df.columns:
+        df["EarlyLeave"] = df["EarlyLeave"].eq("TRUE")
 
     return df
 
 
 def update_players(df):
-    """Update player list in Google Sheet"""
-    sheet.clear()
-    df = df.fillna("")
-    df["Name"] = df["Name"].apply(clean_name)
-    sheet.update([df.columns.values.tolist()] + df.values.tolist())
-
+    """Rewrite the whole player list in Google Sheet with a single batched write.
 
-def generate_matchups(players, num_rounds=3, num_courts=2, min_rest=1):
+    Rows and columns left over from the previous (larger) list are overwritten
+    with blanks instead of clearing the sheet in a separate request. They are
+    measured on the live sheet, so rows added elsewhere since the last cached
+    read are cleared too.
     """
-    Generate balanced matchmaking schedule with:
-    - Strict teammate avoidance until all pairs are used
-    - Opponent avoidance as much as possible
-    - Rest management so players don't play back-to-back
+    previous = sheet.get_all_values()
+    df = df.fillna("")
+    df["Name"] = clean_names(df["Name"])
+    values = [df.columns.values.tolist()] + df.values.tolist()
+
+    n_rows = max(len(values), len(previous))
+    n_cols = max(len(values[0]), max(map(len, previous), default=0))
+    values = [row + [""] * (n_cols - len(row)) for row in values]
+    values += [[""] * n_cols] * (n_rows - len(values))
+
+    sheet.spreadsheet.values_batch_update(
+        {
+            "valueInputOption": "RAW",
+            "data": [{"range": f"'{sheet.title}'!A1", "values": values}],
+        }
+    )
+    get_players.clear()
+
+
+def append_player(name, early_leave):
+    """Add one player as a new row; a blank sheet gets its header row as well."""
+    new_row = {"Name": clean_name(name), "EarlyLeave": bool(early_leave)}
+    # Read the header live: a stale cache could take a sheet someone else
+    # just wrote to for a blank one and overwrite their rows
+    columns = sheet.row_values(1)
+    if not columns:
+        update_players(pd.DataFrame([new_row]))
+        return
+    sheet.append_row([new_row.get(col, "") for col in columns], value_input_option="RAW")
+    get_players.clear()
+
+
+def delete_player(name):
+    """Delete a player's row from Google Sheet. Returns False if the name isn't there."""
+    # Look the row up on the sheet itself so a stale cache can't point at the
+    # wrong one; compare cleaned names, as the selectbox lists them cleaned
+    name_col = get_players().columns.get_loc("Name") + 1
+    values = sheet.col_values(name_col)[1:]
+    name = clean_name(name)
+    row = next((i + 2 for i, v in enumerate(values) if clean_name(v) == name), None)
+    if row is None:
+        return False
+    sheet.delete_rows(row)
+    get_players.clear()
+    return True
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _generate_matchups_cached(players, num_rounds, num_courts, min_rest, seed):
     """
-    players = [clean_name(p) for p in players]
-    teammate_history = defaultdict(int)
-    match_history = defaultdict(int)
-    last_played_round = {p: -min_rest for p in players}
-
-    # Precompute all unique teammate pairs
-    all_pairs = list(itertools.combinations(sorted(players), 2))
-    pair_usage = {pair: 0 for pair in all_pairs}
-
-    all_rounds = []
-
-    for r in range(num_rounds):
-        available_players = players[:]
-        available_players.sort(key=lambda p: r - last_played_round[p], reverse=True)
-
-        matches = []
-        used_players = set()
-
-        while len([p for p in available_players if p not in used_players]) >= 4:
-            best_group = None
-            best_score = float("inf")
-            candidates = [p for p in available_players if p not in used_players]
-
-            for _ in range(100):  # Try more combinations for better fairness
-                if len(candidates) < 4:
-                    break
-                sample = random.sample(candidates, 4)
-                p1, p2, p3, p4 = sample
-
-                team1 = tuple(sorted((p1, p2)))
-                team2 = tuple(sorted((p3, p4)))
-                match = frozenset([team1, team2])
-
-                # Strict teammate penalty: prefer unused pairs
-                team1_penalty = pair_usage[team1] * 10  # big weight
-                team2_penalty = pair_usage[team2] * 10
-
-                # Opponent repeat penalty
-                match_penalty = match_history[match] * 5
-
-                # Rest penalty
-                rest_penalty = sum(
-                    0 if (r - last_played_round[p]) >= min_rest else 20
-                    for p in sample
-                )
-
-                score = team1_penalty + team2_penalty + match_penalty + rest_penalty
-
-                if score < best_score:
-                    best_score = score
-                    best_group = sample
-
-            if best_group:
-                p1, p2, p3, p4 = best_group
-                team1 = tuple(sorted((p1, p2)))
-                team2 = tuple(sorted((p3, p4)))
-                match = frozenset([team1, team2])
-
-                matches.append((team1, team2))
-
-                pair_usage[team1] += 1
-                pair_usage[team2] += 1
-                match_history[match] += 1
-
-                for p in best_group:
-                    used_players.add(p)
-                    last_played_round[p] = r
-
-        leftovers = [p for p in available_players if p not in used_players]
-        if leftovers:
-            matches.append(((tuple(leftovers),), ("BYE",)))
-
-        court = 1
-        for m in matches:
-            t1, t2 = m
-            all_rounds.append(
-                {
-                    "Round": r + 1,
-                    "Court": str(court),
-                    "Team 1": " & ".join(t1) if len(t1) > 1 else t1[0],
-                    "Team 2": " & ".join(t2) if len(t2) > 1 else t2[0],
-                }
-            )
-            court += 1
-            if court > num_courts:
-                court = 1
-
-    return pd.DataFrame(all_rounds)
+    Memoized generate_matchups; the same roster, settings and seed give the
+    same schedule. Only recent schedules are kept, as reshuffles use new seeds.
+    """
+    return generate_matchups(
+        list(players), num_rounds, num_courts, min_rest, rng=np.random.default_rng(seed)
+    )
 
 
 def write_matchups_to_sheet(df):
-    """Write matchmaking results to a separate sheet, grouped by round (safe strings)."""
-    sh = client.open(SHEET_NAME)
-    try:
-        matchup_sheet = sh.worksheet("Matchmaking")
-    except gspread.WorksheetNotFound:
-        matchup_sheet = sh.add_worksheet(title="Matchmaking", rows="100", cols="20")
+    """
+    Write matchmaking results to a separate sheet, grouped by round (safe strings).
 
-    output_data = []
-    for round_num in sorted(df["Round"].unique()):
-        output_data.append([f"Round {round_num}"])
-        round_data = df[df["Round"] == round_num][["Court", "Team 1", "Team 2"]]
+    Old values are cleared and the new rows appended in a single batchUpdate;
+    appendCells grows the grid as needed, so long schedules always fit.
+    """
+    matchup_sheet = get_matchup_sheet()
 
-        round_data = round_data.astype(str)
-        output_data.append(round_data.columns.tolist())
-        for row in round_data.values.tolist():
-            output_data.append([str(v) for v in row])
-        output_data.append([])
+    columns = ["Court", "Team 1", "Team 2"]
+    grouped = df.astype({c: str for c in columns}).groupby("Round", sort=True)
 
-    matchup_sheet.clear()
-    matchup_sheet.update(output_data)
+    output_data = []
+    append = output_data.append
+    for round_num, round_data in grouped:
+        append([f"Round {round_num}"])
+        append(columns)
+        output_data.extend(round_data[columns].values.tolist())
+        append([])
+
+    rows = [
+        {"values": [{"userEnteredValue": {"stringValue": v}} for v in row]}
+        for row in output_data
+    ]
+    get_spreadsheet().batch_update(
+        {
+            "requests": [
+                {
+                    "updateCells": {
+                        "range": {"sheetId": matchup_sheet.id},
+                        "fields": "userEnteredValue",
+                    }
+                },
+                {
+                    "appendCells": {
+                        "sheetId": matchup_sheet.id,
+                        "rows": rows,
+                        "fields": "userEnteredValue",
+                    }
+                },
+            ]
+        }
+    )
 
 
 # ======================
@@ -189,11 +201,12 @@ if menu == "Player List":
         submitted = st.form_submit_button("Add Player")
 
         if submitted and name:
-            new_row = {"Name": clean_name(name), "EarlyLeave": early_leave}
-            df = pd.concat([df, pd.DataFrame([new_row])], ignore_index=True)
-            update_players(df)
-            st.success(f"{name} added successfully!")
-            st.rerun()
+            try:
+                append_player(name, early_leave)
+                st.success(f"{name} added successfully!")
+                st.rerun()
+            except gspread.exceptions.APIError as e:
+                st.error(f"❌ Failed to add player: {e}")
 
     if not df.empty:
         with st.form("delete_player_form"):
@@ -206,14 +219,14 @@ if menu == "Player List":
             delete_btn = st.form_submit_button("Delete Player")
 
             if delete_btn:
-                current_df = get_players()
-                if player_to_delete in current_df["Name"].values:
-                    updated_df = current_df[current_df["Name"] != player_to_delete].reset_index(drop=True)
-                    update_players(updated_df)
-                    st.success(f"✅ {player_to_delete} has been removed!")
-                    st.rerun()
-                else:
-                    st.error("⚠️ Player not found — please refresh and try again.")
+                try:
+                    if delete_player(player_to_delete):
+                        st.success(f"✅ {player_to_delete} has been removed!")
+                        st.rerun()
+                    else:
+                        st.error("⚠️ Player not found — please refresh and try again.")
+                except gspread.exceptions.APIError as e:
+                    st.error(f"❌ Failed to delete player: {e}")
 
 elif menu == "Matchmaking":
     st.subheader("🎲 Matchmaking Generator")
@@ -227,12 +240,31 @@ elif menu == "Matchmaking":
         num_courts = st.number_input("Number of Courts", 1, 10, 3)
         min_rest = st.number_input("Minimum Rounds to Rest", 0, 5, 1)
 
-        if st.button("Generate Matchups"):
-            matchups = generate_matchups(players, num_rounds, num_courts, min_rest)
+        if "matchup_seed" not in st.session_state:
+            st.session_state.matchup_seed = 0
+
+        generate = st.button("Generate Matchups")
+        reshuffle = st.button("🔀 Reshuffle")
+        if reshuffle:
+            st.session_state.matchup_seed = new_seed()
+
+        # Keep the last schedule on screen across unrelated reruns; it is only
+        # regenerated (and written to the sheet) when a button is pressed.
+        key = (tuple(sorted(players)), num_rounds, num_courts, min_rest)
+        if generate or reshuffle:
+            st.session_state.matchups = (
+                key,
+                _generate_matchups_cached(*key, st.session_state.matchup_seed),
+            )
+
+        saved = st.session_state.get("matchups")
+        if saved is not None and saved[0] == key:
+            matchups = saved[1]
             st.dataframe(matchups)
 
-            try:
-                write_matchups_to_sheet(matchups)
-                st.success("✅ Matchups have been written to the 'Matchmaking' sheet!")
-            except Exception as e:
-                st.error(f"❌ Failed to write to sheet: {e}")
+            if generate or reshuffle:
+                try:
+                    write_matchups_to_sheet(matchups)
+                    st.success("✅ Matchups have been written to the 'Matchmaking' sheet!")
+                except Exception as e:
+                    st.error(f"❌ Failed to write to sheet: {e}")
@@ -0,0 +1,329 @@
+"""Schedule generation for the badminton scheduler; no Streamlit or Sheets code."""
+import pandas as pd
+import numpy as np
+from numba import njit, types
+from numba.typed import Dict
+import re
+import sys
+
+# Shared PCG64 generator for unseeded schedules and new reshuffle seeds
+_rng = np.random.default_rng()
+
+
+def _nonprintable_pattern():
+    """Regex matching every character for which str.isprintable() is False."""
+    ranges = []
+    for c in range(sys.maxunicode + 1):
+        if not chr(c).isprintable():
+            if ranges and ranges[-1][1] == c - 1:
+                ranges[-1][1] = c
+            else:
+                ranges.append([c, c])
+    return re.compile(
+        "[" + "".join(f"\\U{lo:08x}-\\U{hi:08x}" for lo, hi in ranges) + "]"
+    )
+
+
+# Built from the running interpreter's Unicode database, so it tracks
+# str.isprintable exactly, unassigned code points included
+_NONPRINTABLE = _nonprintable_pattern()
+
+
+def clean_name(name: str) -> str:
+    """Remove non-printable characters and extra spaces from names."""
+    return _NONPRINTABLE.sub("", str(name).strip())
+
+
+def clean_names(names: pd.Series) -> pd.Series:
+    """Vectorized clean_name for a whole column of names."""
+    return names.astype(str).str.strip().str.replace(_NONPRINTABLE, "", regex=True)
+
+
+def new_seed():
+    """Fresh seed for a reshuffled schedule."""
+    return int(_rng.integers(2**32))
+
+
+@njit(cache=True)
+def _pair_teams(teams, opponents):
+    """
+    Pair up teams (rows of two player ids) for courts: taking teams in order,
+    each unpaired team faces the unpaired team its players have met least.
+    Updates opponents in place; returns the pairs as row indices into teams.
+    """
+    m = teams.shape[0]
+    paired = np.zeros(m, dtype=np.bool_)
+    pairs = np.empty((m // 2, 2), dtype=np.int64)
+
+    for k in range(m // 2):
+        i = 0
+        while paired[i]:
+            i += 1
+        paired[i] = True
+
+        best, best_met = -1, np.iinfo(np.int64).max
+        for j in range(i + 1, m):
+            if paired[j]:
+                continue
+            met = 0
+            for x in range(2):
+                for y in range(2):
+                    met += opponents[teams[i, x], teams[j, y]]
+            if met < best_met:
+                best, best_met = j, met
+        paired[best] = True
+
+        for x in range(2):
+            for y in range(2):
+                opponents[teams[i, x], teams[best, y]] += 1
+                opponents[teams[best, y], teams[i, x]] += 1
+        pairs[k, 0], pairs[k, 1] = i, best
+
+    return pairs
+
+
+def _circle_teams(n_players, r):
+    """
+    Teams of round r by the circle method: player 0 keeps its seat while
+    players 1..n-1 rotate by one seat each round, and seats i and n-1-i form
+    a team. Nobody sits out, so n/2 must be even.
+    """
+    others = list(range(1, n_players))
+    k = r % len(others)
+    seats = [0] + others[k:] + others[:k]
+    return [(seats[i], seats[n_players - 1 - i]) for i in range(n_players // 2)], []
+
+
+def _halves_teams(n_players, r):
+    """
+    Teams of round r when h = n/2 is odd, so one team sits out every round.
+
+    The players are split into halves x_k = k and y_k = h + k (k mod h). In
+    rounds i < h, x_{i-k} teams with x_{i+k} and y_{i-k} with y_{i+k}, while
+    x_i and y_i sit out together. In rounds h - 1 + t, x_k teams with
+    y_{k+t}, and x_{t-1} and y_{2t-1} sit out. So every player sits out once
+    in the first h rounds, at most once in the rest, never twice in a row.
+    """
+    h = n_players // 2
+    r %= n_players - 1
+    if r < h:
+        x_teams = [((r - k) % h, (r + k) % h) for k in range(1, h // 2 + 1)]
+        teams = x_teams + [(h + a, h + b) for a, b in x_teams]
+        return teams, [r, h + r]
+
+    t = r - h + 1
+    teams = [(k, h + (k + t) % h) for k in range(h)]
+    return teams, list(teams.pop(t - 1))
+
+
+def whist_tournament(n_players, n_rounds):
+    """
+    Round-robin doubles schedule: each round's teams come from a different
+    perfect matching of the players (see _circle_teams and _halves_teams),
+    so every pair of players is teamed at most once in the first n-1 rounds.
+    Teams are then paired onto courts greedily by fewest previous meetings.
+    Requires an even number of players.
+
+    Returns one (matches, leftovers) tuple per round, with players as ids.
+    """
+    round_teams = _circle_teams if n_players // 2 % 2 == 0 else _halves_teams
+    opponents = np.zeros((n_players, n_players), dtype=np.int32)
+    rounds = []
+
+    for r in range(n_rounds):
+        teams, leftovers = round_teams(n_players, r)
+
+        pairs = _pair_teams(np.array(teams, dtype=np.int64), opponents)
+        matches = [(teams[i], teams[j]) for i, j in pairs.tolist()]
+
+        rounds.append((matches, leftovers))
+
+    return rounds
+
+
+# The three ways to split a group of four into two teams
+_TEAM_SPLITS = np.array([[0, 1, 2, 3], [0, 2, 1, 3], [0, 3, 1, 2]])
+
+
+@njit(cache=True)
+def _group_score(p1, p2, p3, p4, teammate_hist, match_history):
+    """Cost of (p1, p2) vs (p3, p4): repeated teammates cost 10 each, a repeated match 5."""
+    n = teammate_hist.shape[0]
+    a, b = min(p1, p2), max(p1, p2)
+    c, d = min(p3, p4), max(p3, p4)
+    used1 = teammate_hist[a, b]
+    used2 = teammate_hist[c, d]
+    score = (used1 + used2) * 10
+
+    # A match can only repeat if both teams have played together before
+    if used1 > 0 and used2 > 0:
+        k1, k2 = min(a * n + b, c * n + d), max(a * n + b, c * n + d)
+        score += match_history.get(k1 << 32 | k2, 0) * 5
+    return score
+
+
+@njit(cache=True)
+def _least_used_pair(pool, size, teammate_hist, skip1, skip2):
+    """Positions i < j in pool[:size] whose players have teamed up least often."""
+    best_i, best_j, best_used = -1, -1, np.iinfo(np.int32).max
+    for i in range(size):
+        if i == skip1 or i == skip2:
+            continue
+        for j in range(i + 1, size):
+            if j == skip1 or j == skip2:
+                continue
+            used = teammate_hist[min(pool[i], pool[j]), max(pool[i], pool[j])]
+            if used < best_used:
+                best_i, best_j, best_used = i, j, used
+                if used == 0:
+                    return best_i, best_j  # never teamed up: nothing can beat it
+    return best_i, best_j
+
+
+@njit(cache=True)
+def _select_quartet(pool, size, teammate_hist, match_history):
+    """
+    Greedily pick the next match from pool[:size]: the least-used teammate pair,
+    then the least-used pair among the rest, arranged into whichever of the
+    three team splits scores lowest. Returns the four pool positions, the
+    first two forming one team.
+    """
+    i1, j1 = _least_used_pair(pool, size, teammate_hist, -1, -1)
+    i2, j2 = _least_used_pair(pool, size, teammate_hist, i1, j1)
+    group = np.array([i1, j1, i2, j2])
+
+    best, best_score = 0, np.iinfo(np.int64).max
+    for s in range(3):
+        q = group[_TEAM_SPLITS[s]]
+        score = _group_score(
+            pool[q[0]], pool[q[1]], pool[q[2]], pool[q[3]], teammate_hist, match_history
+        )
+        if score < best_score:
+            best, best_score = s, score
+            if score == 0:
+                break  # fresh teams and a fresh match: nothing can beat it
+
+    return group[_TEAM_SPLITS[best]]
+
+
+def greedy_schedule(n_players, n_rounds, min_rest, rng):
+    """
+    Greedy schedule: each match takes the least-used teammate pairs among the
+    players still free, split into teams to avoid repeated matches. Players
+    are visited in random order, so ties break differently for each rng.
+    Players who have not rested min_rest rounds sit out; if fewer than four
+    players are rested, those who have rested longest play instead.
+
+    Returns one (matches, leftovers) tuple per round, with players as ids.
+    """
+    n = n_players
+
+    # Teammate counts live in the upper triangle, teammate_hist[a, b] with a < b.
+    # A match is keyed by its two team ids a * n + b packed into one int.
+    teammate_hist = np.zeros((n, n), dtype=np.int32)
+    match_history = Dict.empty(key_type=types.int64, value_type=types.int64)
+    last_played_round = np.full(n, -min_rest, dtype=np.int32)
+
+    # Every player id, reshuffled in place each round. The players that can
+    # still be picked are pool[:size]; picked players are swapped behind them.
+    pool = np.arange(n, dtype=np.int32)
+    rounds = []
+
+    for r in range(n_rounds):
+        rng.shuffle(pool)
+        matches = []
+
+        # Only rested players can be picked. If fewer than four are rested,
+        # everyone who has rested at least as long as the player filling the
+        # last court can be picked, longest-rested first.
+        rested = (r - last_played_round) >= min_rest
+        drawable = int(rested.sum())
+        if drawable < 4 and n >= 4:
+            pool[:] = pool[np.argsort(last_played_round[pool], kind="stable")]
+            cutoff = last_played_round[pool[4 * (n // 4) - 1]]
+            drawable = int((last_played_round <= cutoff).sum())
+        elif drawable < n:
+            # Rested players to the front, keeping their shuffled order
+            pool[:] = pool[np.argsort(~rested[pool], kind="stable")]
+        size = drawable
+
+        while size >= 4 and len(matches) < n // 4:
+            chosen = _select_quartet(pool, size, teammate_hist, match_history)
+            p1, p2, p3, p4 = pool[chosen].tolist()
+            a, b = sorted((p1, p2))
+            c, d = sorted((p3, p4))
+            k1, k2 = sorted((a * n + b, c * n + d))
+
+            matches.append(((a, b), (c, d)))
+
+            teammate_hist[a, b] += 1
+            teammate_hist[c, d] += 1
+            match_history[k1 << 32 | k2] = match_history.get(k1 << 32 | k2, 0) + 1
+            last_played_round[[a, b, c, d]] = r
+
+            for i in sorted(chosen.tolist(), reverse=True):
+                size -= 1
+                pool[i], pool[size] = pool[size], pool[i]
+
+        # Unpicked: what is left of the drawable block, plus everyone resting
+        leftovers = pool[:size].tolist() + pool[drawable:].tolist()
+        rounds.append((matches, leftovers))
+
+    return rounds
+
+
+def generate_matchups(players, num_rounds=3, num_courts=2, min_rest=1, rng=None):
+    """
+    Generate balanced matchmaking schedule with:
+    - Strict teammate avoidance until all pairs are used
+    - Opponent avoidance as much as possible
+    - Rest management so players don't play back-to-back
+
+    Even rosters that need no forced rest and no more rounds than there are
+    distinct partners get an exact round-robin (see whist_tournament); all
+    other cases use greedy_schedule.
+
+    Pass a seeded numpy Generator as rng for a reproducible schedule.
+    """
+    names = [clean_name(p) for p in players]
+    n = len(names)
+    if rng is None:
+        rng = _rng
+
+    if n >= 4 and n % 2 == 0 and min_rest <= 1 and num_rounds < n:
+        # Shuffle seats so the fixed schedule differs from run to run
+        seat_to_player = rng.permutation(n).tolist()
+        rounds = [
+            (
+                [
+                    (tuple(seat_to_player[s] for s in t1), tuple(seat_to_player[s] for s in t2))
+                    for t1, t2 in matches
+                ],
+                [seat_to_player[s] for s in leftovers],
+            )
+            for matches, leftovers in whist_tournament(n, num_rounds)
+        ]
+    else:
+        rounds = greedy_schedule(n, num_rounds, min_rest, rng)
+
+    # One row of ids per court: (round, court, a, b, c, d), teams (a, b) vs
+    # (c, d). Players sitting out share a BYE row whose Team 1 is set below.
+    rows = []
+    byes = {}
+    for r, (id_matches, id_leftovers) in enumerate(rounds):
+        for court, (t1, t2) in enumerate(id_matches):
+            rows.append((r + 1, court % num_courts + 1, *sorted(t1), *sorted(t2)))
+        if id_leftovers:
+            byes[len(rows)] = " & ".join(names[p] for p in id_leftovers)
+            rows.append((r + 1, len(id_matches) % num_courts + 1, 0, 0, 0, 0))
+
+    ids = np.array(rows, dtype=np.int64).reshape(-1, 6)
+    id_to_name = np.array(names, dtype=object)
+    df = pd.DataFrame({"Round": ids[:, 0], "Court": ids[:, 1].astype(str)})
+    df["Team 1"] = id_to_name[ids[:, 2]] + " & " + id_to_name[ids[:, 3]]
+    df["Team 2"] = id_to_name[ids[:, 4]] + " & " + id_to_name[ids[:, 5]]
+    if byes:
+        df.loc[list(byes), "Team 1"] = list(byes.values())
+        df.loc[list(byes), "Team 2"] = "BYE"
+
+    return df
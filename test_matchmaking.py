@@ -0,0 +1,33 @@
+import pytest
+
+from matchmaking import whist_tournament
+
+EVEN_SIZES = range(4, 42, 2)
+
+
+@pytest.mark.parametrize("n", EVEN_SIZES)
+def test_whist_every_player_once_per_round(n):
+    for r, (matches, leftovers) in enumerate(whist_tournament(n, n - 1)):
+        seen = [p for t1, t2 in matches for p in t1 + t2] + list(leftovers)
+        assert sorted(seen) == list(range(n)), f"round {r + 1}"
+
+
+@pytest.mark.parametrize("n", EVEN_SIZES)
+def test_whist_no_repeated_teammates(n):
+    for n_rounds in range(1, n):
+        teams = [
+            frozenset(t)
+            for matches, _ in whist_tournament(n, n_rounds)
+            for match in matches
+            for t in match
+        ]
+        assert len(teams) == len(set(teams)), f"{n_rounds} rounds"
+
+
+@pytest.mark.parametrize("n", EVEN_SIZES)
+def test_whist_no_back_to_back_byes(n):
+    for n_rounds in range(1, n):
+        rounds = whist_tournament(n, n_rounds)
+        for r in range(1, len(rounds)):
+            repeated = set(rounds[r - 1][1]) & set(rounds[r][1])
+            assert not repeated, f"{n_rounds} rounds, round {r + 1}: {repeated}"